@@ -40,15 +40,26 @@ class Progress:
         coroutines whose wait times have now been passed or reached.
         """
         assert time >= self.time, "cannot progress backwards"
+        if time == self.time:
+            # Nothing can have been triggered by this, so there is no
+            # need to check the waiting futures again.
+            return
         self.time = time
-        # Use index-based for loop so we can call del in the loop.
-        for index in reversed(range(0, len(self._futures))):
-            trigger_spec, future = self._futures[index]
+        # Rebuild the list of waiting futures, dropping those that are
+        # triggered now as well as those whose waiters have been
+        # cancelled in the meantime (which happens regularly while
+        # simulators wait for their next step), so that these are not
+        # checked again on every progress change.
+        waiting: List[Tuple[TriggerSpec, asyncio.Future[TieredTime]]] = []
+        for trigger_spec, future in self._futures:
+            if future.cancelled():
+                continue
             triggered_time = self._triggered_time(trigger_spec)
             if triggered_time:
-                if not future.cancelled():
-                    future.set_result(triggered_time)
-                del self._futures[index]
+                future.set_result(triggered_time)
+            else:
+                waiting.append((trigger_spec, future))
+        self._futures = waiting
 
     def _triggered_time(self, trigger_spec: TriggerSpec) -> None | TieredTime:
         """Get the actual (destination) time at which ``trigger_spec``
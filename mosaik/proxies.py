@@ -4,7 +4,7 @@ from abc import ABC, abstractmethod
 import asyncio
 from copy import deepcopy
 from inspect import isgeneratorfunction
-from typing import Any, Dict, Iterator, List, Tuple
+from typing import Any, Dict, List, Tuple, cast
 from loguru import logger
 
 from mosaik_api_v3 import check_api_compliance, MosaikProxy, Simulator
@@ -21,6 +21,8 @@ class Proxy(ABC):
     appropriate ``Adapter`` subclasses to bring the interface of the
     connected simulator in line with the most up-to-date API version.
     """
+    __slots__ = ()
+
     @abstractmethod
     async def send(self, request: Any) -> Any:
         """Send a request to the connected simulator.
@@ -56,6 +58,7 @@ class BaseProxy(Proxy):
     more ``Adapter``s to allow treating the simulator as up-to-date from
     other parts of mosaik.
     """
+    __slots__ = ()
 
     @abstractmethod
     async def init(
@@ -82,10 +85,14 @@ class LocalProxy(BaseProxy):
     """
     sim: Simulator
     """The underlying ``mosaik_api.Simulator."""
+    _methods: Dict[str, Tuple[Any, bool]]
+    """The bound methods of the simulator that have been called so far,
+    by name, together with whether they are generator functions."""
 
     def __init__(self, sim: Simulator, mosaik_remote: MosaikProxy):
         super().__init__()
         self.sim = sim
+        self._methods = {}
         sim.mosaik = mosaik_remote
 
     async def init(self, sid: SimId, **kwargs: Any) -> List[int]:
@@ -100,7 +107,7 @@ class LocalProxy(BaseProxy):
             del kwargs["time_resolution"]
 
         meta = await self.send(("init", (sid,), kwargs))
-        self._meta = deepcopy(meta)
+        self._meta = _copy_meta(meta)
         version = extract_version(meta)
         if forced_old_api and version >= [3]:
             raise ScenarioError(
@@ -118,15 +125,20 @@ class LocalProxy(BaseProxy):
 
     async def send(self, request: Tuple[str, Tuple[Any, ...], Dict[str, Any]]):
         func_name, args, kwargs = request
-        func = getattr(self.sim, func_name)
         # A simulator that makes requests back to mosaik (like set_data or set_event)
         # will have generator functions instead of normal functions as its init, create,
         # step and/or get_data. It will yield coroutines that produce the required
         # information, which we have to await. (This is due to simpy, which used
         # generator functions for its asynchronicity; we didn't want to break the API.)
-        # TODO: Maybe check this during __init__ and create the right methods instead of
-        # checking for isgeneratorfunction on each call?
-        if isgeneratorfunction(func):
+        # As the same methods are called in every step, we look each of them up and
+        # check it for isgeneratorfunction only on its first call.
+        try:
+            func, is_generator = self._methods[func_name]
+        except KeyError:
+            func = getattr(self.sim, func_name)
+            is_generator = isgeneratorfunction(func)
+            self._methods[func_name] = (func, is_generator)
+        if is_generator:
             gen = func(*args, **kwargs)
             try:
                 incoming_request = next(gen)
@@ -142,15 +154,22 @@ class LocalProxy(BaseProxy):
 
 
 class RemoteProxy(BaseProxy):
+    __slots__ = [
+        '_channel', '_reader_task', '_mosaik_remote', '_remote_methods', '_meta'
+    ]
     _channel: Channel
     _reader_task: asyncio.Task[None]
-    _outgoing_msg_counter: Iterator[int]
     _mosaik_remote: MosaikProxy
+    _remote_methods: Dict[str, Any]
+    """The bound methods of the ``MosaikRemote`` that the simulator has
+    called so far, by name."""
+    _meta: Meta
 
     def __init__(self, channel: Channel, mosaik_remote: MosaikProxy):
         super().__init__()
         self._channel = channel
         self._mosaik_remote = mosaik_remote
+        self._remote_methods = {}
         self._reader_task = asyncio.create_task(
             self._handle_remote_requests(),
             name="handle remote requests for ???"
@@ -161,7 +180,11 @@ class RemoteProxy(BaseProxy):
             while True:
                 request = await self._channel.next_request()
                 func_name, args, kwargs = request.content
-                func = getattr(self._mosaik_remote, func_name)
+                try:
+                    func = self._remote_methods[func_name]
+                except KeyError:
+                    func = getattr(self._mosaik_remote, func_name)
+                    self._remote_methods[func_name] = func
                 try:
                     result = await func(*args, **kwargs)
                     await request.set_result(result)
@@ -201,6 +224,25 @@ class RemoteProxy(BaseProxy):
         await self._reader_task
 
 
+def _copy_meta(value: Any) -> Any:
+    """Return a deep copy of *value*, which is usually a simulator's meta.
+
+    Metas consist (almost) only of dicts, lists and primitive values, so
+    these are copied directly, which is much faster than ``deepcopy``.
+    Anything else is still passed to ``deepcopy``.
+    """
+    if isinstance(value, dict):
+        return {
+            key: _copy_meta(val)
+            for key, val in cast(Dict[str, Any], value).items()
+        }
+    if isinstance(value, list):
+        return [_copy_meta(val) for val in cast(List[Any], value)]
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return deepcopy(value)
+
+
 def extract_version(meta: Meta) -> List[int]:
     if "api_version" not in meta:
         return [1]
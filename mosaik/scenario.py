@@ -17,7 +17,7 @@ from dataclasses import dataclass
 from mosaik.greetings_util import print_greetings
 import itertools
 from loguru import logger
-from mosaik_api_v3 import OutputData, OutputRequest
+from mosaik_api_v3 import OutputData, OutputRequest, Time
 import networkx
 from tqdm import tqdm
 from typing import (
@@ -65,6 +65,7 @@ base_config: MosaikConfigTotal = {
 }
 
 FULL_ID = simmanager.FULL_ID
+FULL_ID_SEP = simmanager.FULL_ID_SEP
 
 SENTINEL = object()
 """Sentinel for initial data call (we can't use None as the user might
@@ -214,7 +215,22 @@ class World(object):
 
     sim_progress: float
     """The progress of the entire simulation (in percent)."""
+    progress_sum: int
+    """The sum of the progress of all simulators (in time steps). This
+    is kept up to date while the simulation runs so that `sim_progress`
+    can be computed without going through all simulators.
+    """
+    sims_done: int
+    """The number of simulators whose progress has reached `until`."""
     use_cache: bool
+    last_step_heap: List[Tuple[Time, SimId]]
+    """A heap of the simulators' last step times (one entry per
+    simulator), used to find the earliest time still needed in the
+    output cache. Entries of simulators that have stepped on since are
+    refreshed lazily.
+    """
+    pruned_until: Optional[Time]
+    """The time before which the output cache was last pruned."""
     loop: asyncio.AbstractEventLoop
     sims: Dict[SimId, simmanager.SimRunner]
     """A dictionary of already started simulators instances."""
@@ -266,6 +282,8 @@ class World(object):
 
         self.entity_graph = networkx.Graph()
         self.sim_progress = 0
+        self.progress_sum = 0
+        self.sims_done = 0
 
         self._debug = False
         if debug:
@@ -281,6 +299,8 @@ class World(object):
         # Contains ID counters for each simulator type.
         self._sim_ids = defaultdict(itertools.count)
         self.use_cache = cache
+        self.last_step_heap = []
+        self.pruned_until = None
 
     @contextlib.contextmanager
     def group(self):
@@ -520,6 +540,7 @@ class World(object):
         """
         sim = self.sims[sid]
         sim.next_steps = [TieredTime(time) + sim.from_world_time]
+        sim.next_steps_set = set(sim.next_steps)
 
     def get_data(
         self,
@@ -647,6 +668,10 @@ class World(object):
         self.ensure_no_dataflow_cycles()
 
         self.cache_triggering_ancestors()
+        self.cache_triggers()
+        self.cache_pulled_inputs()
+        self.cache_pushed_outputs()
+        self.cache_dependencies()
 
         logger.info('Starting simulation.')
         # 11 is the length of "Total: 100%"
@@ -731,6 +756,81 @@ class World(object):
                             dest_sim.triggering_ancestors[src_sim] = src_to_dest
         return
 
+    def cache_triggers(self):
+        """Store the inverse of the triggering ancestors relation as each
+        simulator's triggering descendants and group each simulator's
+        triggers by entity. This needs to be called after
+        :meth:`cache_triggering_ancestors`.
+        """
+        for sim in self.sims.values():
+            sim.triggering_descendants = []
+            sim.triggers_by_eid = {}
+            for (eid, attr), port_triggers in sim.triggers.items():
+                sim.triggers_by_eid.setdefault(eid, []).append((attr, port_triggers))
+        for sim in self.sims.values():
+            for anc_sim in sim.triggering_ancestors:
+                if anc_sim is not sim:
+                    anc_sim.triggering_descendants.append(sim)
+
+    def cache_pulled_inputs(self):
+        """Flatten the pulled inputs of each simulator into the plan
+        that is iterated while collecting its input data, so that this
+        does not need to be done again in every step. The dataflows from
+        each source are sorted by their destination.
+        """
+        for sim in self.sims.values():
+            sim.pulled_input_plan = [
+                (
+                    src_sim,
+                    delay.tiers[0],
+                    tuple(
+                        (
+                            src_eid,
+                            src_attr,
+                            FULL_ID % (src_sim.sid, src_eid),
+                            dest_eid,
+                            dest_attr,
+                        )
+                        for (src_eid, src_attr), (dest_eid, dest_attr) in sorted(
+                            dataflows, key=lambda dataflow: dataflow[1]
+                        )
+                    ),
+                )
+                for (src_sim, delay), dataflows in sim.pulled_inputs.items()
+            ]
+
+    def cache_pushed_outputs(self):
+        """Flatten the pushed outputs of each simulator into the plan
+        that is iterated after each of its steps.
+        """
+        for sim in self.sims.values():
+            sim.output_push_plan = [
+                (
+                    src_eid,
+                    src_attr,
+                    FULL_ID % (sim.sid, src_eid),
+                    tuple(
+                        (dest_sim, time_shift.tiers[0], dest_eid, dest_attr)
+                        for dest_sim, time_shift, (dest_eid, dest_attr) in destinations
+                    ),
+                )
+                for (src_eid, src_attr), destinations in sim.output_to_push.items()
+            ]
+
+    def cache_dependencies(self):
+        """Store the predecessors, successors and triggering ancestors
+        of each simulator as flat tuples, as these do not change once
+        the simulation runs. This needs to be called after
+        :meth:`cache_triggering_ancestors`.
+        """
+        for sim in self.sims.values():
+            sim.input_delay_list = tuple(sim.input_delays.items())
+            sim.successor_list = tuple(sim.successors.items())
+            sim.successor_to_wait_for_list = tuple(
+                sim.successors_to_wait_for.items()
+            )
+            sim.triggering_ancestor_list = tuple(sim.triggering_ancestors.items())
+
     def ensure_no_dataflow_cycles(self):
         """Make sure that there is no cyclic dataflow with 0 total
         delay. Raise an exception with one such cycle otherwise.
@@ -814,7 +914,7 @@ def update_min(a: T | None, b: T) -> T | None:
     return b
 
 
-MOSAIK_METHODS = set(
+MOSAIK_METHODS = frozenset(
     ["init", "create", "setup_done", "step", "get_data", "finalize", "stop"]
 )
 
@@ -876,7 +976,7 @@ class ModelFactory():
                     f"Simulator {sid} uses an illegal name for an extra method: "
                     f'"{meth_name}". This is already the name of a mosaik API method.'
                 )
-            if meth_name in self.models.keys():
+            if meth_name in self.models:
                 raise ScenarioError(
                     f"Simulator {sid} uses an illegal name for an extra method: "
                     f'"{meth_name}". This is already the name of a model of this '
@@ -1132,7 +1232,9 @@ class Entity(object):
     """
     An entity represents an instance of a simulation model within mosaik.
     """
-    __slots__ = ['sid', 'eid', 'sim_name', 'model_mock', 'children', 'extra_info']
+    __slots__ = [
+        'sid', 'eid', 'sim_name', 'model_mock', 'children', 'extra_info', '_full_id'
+    ]
     sid: SimId
     """The ID of the simulator this entity belongs to."""
     eid: EntityId
@@ -1160,6 +1262,7 @@ class Entity(object):
         self.model_mock = model_mock
         self.children = list(children) if children is not None else []
         self.extra_info = extra_info
+        self._full_id = f"{sid}{FULL_ID_SEP}{eid}"
 
     @property
     def type(self) -> ModelName:
@@ -1174,7 +1277,7 @@ class Entity(object):
         """
         Full, globally unique entity id ``sid.eid``.
         """
-        return FULL_ID % (self.sid, self.eid)
+        return self._full_id
 
     def triggered_by(self, attr: Attr) -> bool:
         return attr in self.model_mock.event_inputs
@@ -4,18 +4,25 @@ This module is responsible for performing the simulation of a scenario.
 from __future__ import annotations
 
 import asyncio
-from heapq import heappop
+from heapq import heapify, heapreplace
 from loguru import logger
 from math import ceil
 from time import perf_counter
 
-from mosaik_api_v3 import InputData, SimId, Time
+from mosaik_api_v3 import InputData, Time
+from mosaik_api_v3.types import Attr, EntityId, FullId
 
 from mosaik.exceptions import SimulationError
-from mosaik.internal_util import merge_all, merge_existing
-from mosaik.simmanager import FULL_ID, SimRunner
+from mosaik.simmanager import SimRunner
 
-from typing import TYPE_CHECKING, Any, Coroutine, Dict, List, Optional
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+)
 
 from mosaik.tiered_time import TieredTime
 if TYPE_CHECKING:
@@ -23,6 +30,10 @@ if TYPE_CHECKING:
 
 
 SENTINEL = object()
+EMPTY: Dict[Any, Any] = {}
+"""Shared empty dict for lookups that fall back to an empty dict. This
+must never be modified.
+"""
 
 
 async def run(
@@ -50,8 +61,14 @@ async def run(
         rt_factor *= world.time_resolution
     world.rt_factor = rt_factor
 
+    world.progress_sum = 0
+    world.sims_done = 0
     setup_done_events: List[asyncio.Task[None]] = []
     for sim in world.sims.values():
+        sim.end_time = TieredTime(until) + sim.from_world_time
+        world.progress_sum += sim.progress.time.time
+        if sim.progress.time.time >= until:
+            world.sims_done += 1
         sim.tqdm.set_postfix_str('setup')
         # Send a setup_done event to all simulators
         setup_done_events.append(world.loop.create_task(sim.setup_done()))
@@ -86,22 +103,42 @@ async def sim_process(
     Coroutine running the simulator *sim*.
     """
     sim.started = True
+    # All real-time measurements use perf_counter, which is monotonic,
+    # so adjustments of the system clock (e.g. by NTP) cannot distort
+    # the intervals measured in real-time mode.
     sim.rt_start = rt_start = perf_counter()
 
     try:
         advance_progress(sim, world)
+        # Only simulators in a group can perform sub-steps, so the check
+        # for too many loop iterations can be skipped for all others.
+        check_loop_iterations = len(sim.from_world_time) > 1
+        max_loop_iterations = world.max_loop_iterations
+        # A step can only change the progress of this simulator and of
+        # those simulators that it can (indirectly) trigger. In
+        # real-time mode, all other simulators' progress depends on the
+        # passing time, so we advance them all.
+        sims_to_advance: Iterable[SimRunner]
+        if rt_factor:
+            sims_to_advance = world.sims.values()
+        else:
+            sims_to_advance = [sim, *sim.triggering_descendants]
         while await next_step_settled(sim, world):
-            sim.tqdm.set_postfix_str('await input')
+            # The per-step status updates don't redraw the progress bar
+            # themselves; they are shown with its next (rate-limited)
+            # refresh instead.
+            sim.tqdm.set_postfix_str('await input', refresh=False)
             await wait_for_dependencies(sim, lazy_stepping)
-            sim.current_step = heappop(sim.next_steps)
+            sim.current_step = sim.pop_next_step()
             if sim.current_step != sim.progress.time:
                 raise SimulationError(
                     f"Simulator {sim.sid} is trying to perform a step at time "
                     f"{sim.current_step}, but it has already progressed to time "
                     f"{sim.progress.time}."
                 )
-            if any(
-                t >= world.max_loop_iterations for t in sim.current_step.tiers[1:]
+            if (
+                check_loop_iterations
+                and max(sim.current_step.tiers[1:]) >= max_loop_iterations
             ):
                 raise SimulationError(
                     f"Simulator {sim.sid} has performed a sub-step more than "
@@ -113,18 +150,26 @@ async def sim_process(
             input_data = get_input_data(world, sim)
             max_advance = get_max_advance(world, sim, until)
             await step(world, sim, input_data, max_advance)
-            rt_check(rt_factor, rt_start, rt_strict, sim)
-            await get_outputs(world, sim)
+            # In real-time mode, read the clock once per step and use
+            # that point in time both for checking whether we are fast
+            # enough and for advancing all simulators' progress.
+            rt_now = perf_counter() if rt_factor else None
+            if rt_now is not None:
+                rt_check(rt_factor, rt_start, rt_now, rt_strict, sim)
+            # Simulators without any outgoing connections (sinks) have
+            # no outputs to fetch (and notify_dependencies returns right
+            # away as there is nobody to notify).
+            if sim.output_request:
+                await get_outputs(world, sim)
             sim.current_step = None
             notify_dependencies(sim)
-            # TODO: Reduce the number of sims that need to be advanced
-            # (At least only to those that could potentially be
-            # triggered by this step; maybe there's even a more clever
-            # way.)
-            for isim in world.sims.values():
-                advance_progress(isim, world)
-            world.sim_progress = get_progress(world.sims, until)
-            world.tqdm.update(get_avg_progress(world.sims, until) - world.tqdm.n)
+            for isim in sims_to_advance:
+                advance_progress(isim, world, rt_now)
+            # sim_progress is also served to simulators via the
+            # get_progress RPC, so it is always kept up to date.
+            world.sim_progress = get_progress(world)
+            if not world.tqdm.disable:
+                world.tqdm.update(get_avg_progress(world) - world.tqdm.n)
             if world.use_cache:
                 prune_dataflow_cache(world)
         sim.tqdm.set_postfix_str('done')
@@ -144,12 +189,12 @@ async def next_step_settled(sim: SimRunner, world: World) -> bool:
     # As a slight complication, we also need to watch out for the end
     # of the simulation. Once that is reached, we also return, albeit
     # without having found a next step.
-    sim.tqdm.set_postfix_str('await step')
+    sim.tqdm.set_postfix_str('await step', refresh=False)
     while sim.progress.time.time < world.until:
         if sim.next_steps and sim.next_steps[0] == sim.progress.time:
             return True
         else:
-            await_time = sim.next_steps[0] if sim.next_steps else TieredTime(world.until) + sim.from_world_time
+            await_time = sim.next_steps[0] if sim.next_steps else sim.end_time
             _, pending = await asyncio.wait(
                 [
                     asyncio.create_task(sim.progress.has_reached(await_time)),
@@ -166,21 +211,6 @@ async def next_step_settled(sim: SimRunner, world: World) -> bool:
     return False
 
 
-async def rt_sleep(
-    sim: SimRunner,
-    world: World
-) -> None:
-    """
-    If in real-time mode, check if to sleep and do so if necessary.
-    """
-    if world.rt_factor:
-        rt_passed = perf_counter() - sim.rt_start
-        sleep = (world.rt_factor * sim.next_steps[0].time) - rt_passed
-        if sleep > 0:
-            sim.tqdm.set_postfix_str('sleeping')
-            await asyncio.sleep(sleep)
-
-
 async def wait_for_dependencies(
     sim: SimRunner,
     lazy_stepping: bool
@@ -193,21 +223,25 @@ async def wait_for_dependencies(
 
     *world* is a mosaik :class:`~mosaik.scenario.World`.
     """
-    futures: List[Coroutine[Any, Any, TieredTime]] = []
+    # As progress can only increase, the dependencies can be awaited one
+    # after the other: once a dependency is fulfilled, it stays that
+    # way. This avoids wrapping each wait in a task (as gather would),
+    # and dependencies that are already fulfilled return immediately.
     next_step = sim.next_steps[0]
 
-    for pre_sim, delay in sim.input_delays.items():
+    for pre_sim, delay in sim.input_delay_list:
         # Wait for pre_sim if it hasn't progressed enough to provide
         # the input for our current step.
-        futures.append(pre_sim.progress.has_passed(next_step, shift=delay))
-
-    for suc_sim, adapt in sim.successors_to_wait_for.items():
-        futures.append(suc_sim.progress.has_reached(next_step + adapt))
-    if lazy_stepping:
-        for suc_sim, adapt in sim.successors.items():
-            futures.append(suc_sim.progress.has_reached(next_step + adapt))
+        await pre_sim.progress.has_passed(next_step, shift=delay)
 
-    await asyncio.gather(*futures)
+    # The successors we need to wait for are a subset of all successors
+    # (with the same delays), so with lazy stepping it is enough to go
+    # through all successors once.
+    successors = (
+        sim.successor_list if lazy_stepping else sim.successor_to_wait_for_list
+    )
+    for suc_sim, adapt in successors:
+        await suc_sim.progress.has_reached(next_step + adapt)
 
 
 def get_input_data(world: World, sim: SimRunner) -> InputData:
@@ -233,32 +267,36 @@ def get_input_data(world: World, sim: SimRunner) -> InputData:
     *world* is a mosaik :class:`~mosaik.scenario.World`.
     """
     assert sim.current_step is not None
+    # Simulators without any inputs (like pure sources) don't need any
+    # of the merging below.
+    if not (
+        sim.inputs_from_set_data
+        or sim.persistent_inputs
+        or sim.timed_input_buffer
+        or sim.pulled_input_plan
+    ):
+        return {}
     # Input data starts with the data from set_data calls
     input_data = sim.inputs_from_set_data
     sim.inputs_from_set_data = {}
     # Merge the persistent inputs into the input data, adding keys as
-    # necessary. mosaik controls three levels deep, all further levels
-    # therefore should not be merged.
-    merge_all(
-        lambda attrs_new, attrs_old: merge_all(
-            lambda data_new, data_old: merge_all(
-                lambda val_new, val_old: val_new, data_new, data_old
-            ),
-            attrs_new,
-            attrs_old,
-        ),
-        input_data,
-        sim.persistent_inputs,
-    )
+    # necessary.
+    _merge_persistent_inputs(input_data, sim.persistent_inputs)
     # Merge in pushed inputs from the timed input buffer
-    input_data = sim.timed_input_buffer.get_input(input_data, sim.current_step.time)
-
-    for (src_sim, delay), dataflows in sim.pulled_inputs.items():
-        cache = src_sim.get_output_for(sim.current_step.time - delay.tiers[0])
-        for (src_eid, src_attr), (dest_eid, dest_attr) in dataflows:
-            try:
-                val = cache[src_eid][src_attr]
-            except KeyError:
+    now = sim.current_step.time
+    input_data = sim.timed_input_buffer.get_input(input_data, now)
+
+    for src_sim, time_shift, dataflows in sim.pulled_input_plan:
+        cache = src_sim.get_output_for(now - time_shift)
+        # The dataflows are sorted by destination, so consecutive
+        # dataflows into the same input can reuse its dict. (The first
+        # dataflow always replaces the initial empty dict.)
+        last_eid: Optional[EntityId] = None
+        last_attr: Optional[Attr] = None
+        input_vals: Dict[FullId, Any] = {}
+        for src_eid, src_attr, src_full_id, dest_eid, dest_attr in dataflows:
+            val = cache.get(src_eid, EMPTY).get(src_attr, SENTINEL)
+            if val is SENTINEL:
                 logger.warning(
                     f"Simulator {src_sim.sid}'s entity {src_eid} did not produce "
                     f"output on its persistent attribute {src_attr} during its last "
@@ -268,33 +306,76 @@ def get_input_data(world: World, sim: SimRunner) -> InputData:
                     "This will be an error in future versions of mosaik."
                 )
                 val = None
-            input_vals = input_data.setdefault(dest_eid, {}).setdefault(dest_attr, {})
-            input_vals[FULL_ID % (src_sim.sid, src_eid)] = val
-
-    # Merge the data back into the persistent inputs. Here, only keys
-    # that already exist should be updated, as those are the persistent
-    # attributes. (Adding others would make those persistent as well.)
-    merge_existing(
-        lambda attrs_old, attrs_new: merge_existing(
-            lambda data_old, data_new: merge_existing(
-                lambda val_old, val_new: val_new, data_old, data_new
-            ),
-            attrs_old,
-            attrs_new,
-        ),
-        sim.persistent_inputs,
-        input_data,
-    )
+            if dest_eid != last_eid or dest_attr != last_attr:
+                input_vals = input_data.setdefault(dest_eid, {}).setdefault(
+                    dest_attr, {}
+                )
+                last_eid = dest_eid
+                last_attr = dest_attr
+            input_vals[src_full_id] = val
+
+    # Merge the data back into the persistent inputs.
+    _update_persistent_inputs(sim.persistent_inputs, input_data)
     return input_data
 
 
+def _merge_persistent_inputs(input_data: InputData, persistent: InputData):
+    """
+    Merge the *persistent* inputs into *input_data*, adding keys as
+    necessary, but keeping values that are already present.
+
+    mosaik controls three levels deep, all further levels therefore
+    should not be merged. (This is the three-level specialization of
+    nested merge_all calls where the new values win, written out as
+    loops as it runs in every step.)
+    """
+    for eid, persistent_attrs in persistent.items():
+        attrs = input_data.get(eid)
+        if attrs is None:
+            input_data[eid] = persistent_attrs
+            continue
+        for attr, persistent_vals in persistent_attrs.items():
+            vals = attrs.get(attr)
+            if vals is None:
+                attrs[attr] = persistent_vals
+                continue
+            for src_full_id, val in persistent_vals.items():
+                vals.setdefault(src_full_id, val)
+
+
+def _update_persistent_inputs(persistent: InputData, input_data: InputData):
+    """
+    Update the *persistent* inputs with the values in *input_data*.
+
+    Here, only keys that already exist should be updated, as those are
+    the persistent attributes. (Adding others would make those
+    persistent as well.)
+    """
+    for eid, persistent_attrs in persistent.items():
+        attrs = input_data.get(eid)
+        if attrs is None:
+            continue
+        for attr, persistent_vals in persistent_attrs.items():
+            vals = attrs.get(attr)
+            if vals is None or vals is persistent_vals:
+                continue
+            for src_full_id in persistent_vals:
+                val = vals.get(src_full_id, SENTINEL)
+                if val is not SENTINEL:
+                    persistent_vals[src_full_id] = val
+
+
 def get_max_advance(world: World, sim: SimRunner, until: int) -> int:
     """
     Checks how far *sim* can safely advance its internal time during next step
     without causing a causality error.
     """
     ancs_next_steps: List[Time] = []
-    for anc_sim, distance in sim.triggering_ancestors.items():
+    for anc_sim, distance in sim.triggering_ancestor_list:
+        # As in advance_progress, another ancestor's step that is
+        # currently being performed can still trigger us.
+        if anc_sim.current_step and anc_sim is not sim:
+            ancs_next_steps.append((anc_sim.current_step + distance).time)
         if anc_sim.next_steps:
             ancs_next_steps.append((anc_sim.next_steps[0] + distance).time)
 
@@ -322,7 +403,7 @@ async def step(
     it's internal time without causing any causality errors.
     """
     assert sim.current_step is not None
-    sim.tqdm.set_postfix_str('stepping')
+    sim.tqdm.set_postfix_str('stepping', refresh=False)
     sim.is_in_step = True
     next_step_time = await sim.step(sim.current_step.time, inputs, max_advance)
     sim.last_step = sim.current_step
@@ -353,14 +434,17 @@ async def step(
 def rt_check(
     rt_factor: Optional[float],
     rt_start: float,
+    rt_now: float,
     rt_strict: bool,
     sim: SimRunner
 ):
     """
     Check if simulation is fast enough for a given real-time factor.
+
+    *rt_now* is the current :func:`time.perf_counter` reading.
     """
     if rt_factor:
-        rt_passed = perf_counter() - rt_start
+        rt_passed = rt_now - rt_start
         delta = rt_passed - (rt_factor * sim.last_step.time)
         if delta > 0:
             if rt_strict:
@@ -383,10 +467,9 @@ async def get_outputs(world: World, sim: SimRunner):
     *world* is a mosaik :class:`~mosaik.scenario.World`.
     """
     assert sim.current_step is not None
-    sid = sim.sid
     outattr = sim.output_request
     if outattr:
-        sim.tqdm.set_postfix_str('get_data')
+        sim.tqdm.set_postfix_str('get_data', refresh=False)
         data = await sim.get_data(outattr)
 
         output_time: int
@@ -408,15 +491,18 @@ async def get_outputs(world: World, sim: SimRunner):
             sim.outputs[output_time] = data
 
         # Push forward certain data
-        for (src_eid, src_attr), destinations in sim.output_to_push.items():
-            try:
-                val = data[src_eid][src_attr]
-                for dest_sim, time_shift, (dest_eid, dest_attr) in destinations:
-                    dest_sim.timed_input_buffer.add(
-                        output_time + time_shift.tiers[0], sid, src_eid, dest_eid, dest_attr, val
-                    )
-            except KeyError:
-                pass
+        for src_eid, src_attr, src_full_id, destinations in sim.output_push_plan:
+            val = data.get(src_eid, EMPTY).get(src_attr, SENTINEL)
+            if val is SENTINEL:
+                continue
+            for dest_sim, time_shift, dest_eid, dest_attr in destinations:
+                dest_sim.timed_input_buffer.add(
+                    output_time + time_shift,
+                    src_full_id,
+                    dest_eid,
+                    dest_attr,
+                    val,
+                )
         sim.data = data 
 
 
@@ -424,10 +510,20 @@ def notify_dependencies(sim: SimRunner) -> None:
     """
     Notify all simulators waiting for us.
     """
-    for (eid, attr), triggered in sim.triggers.items():
-        if attr in sim.data.get(eid, {}):
-            for dest_sim, delay in triggered:
-                dest_sim.schedule_step(sim.output_time + delay)
+    if not sim.triggers_by_eid:
+        return
+    data = sim.data
+    output_time = sim.output_time
+    # Several ports can trigger the same simulator with the same delay;
+    # schedule_step ignores the steps that are already scheduled.
+    for eid, attr_triggers in sim.triggers_by_eid.items():
+        entity_data = data.get(eid)
+        if entity_data is None:
+            continue
+        for attr, triggered in attr_triggers:
+            if attr in entity_data:
+                for dest_sim, delay in triggered:
+                    dest_sim.schedule_step(output_time + delay)
 
 
 def prune_dataflow_cache(world: World):
@@ -436,7 +532,28 @@ def prune_dataflow_cache(world: World):
     """
     if not world.use_cache:
         return
-    min_cache_time = min(s.last_step.time for s in world.sims.values())
+    # The heap holds one entry per simulator. As last steps only ever
+    # increase, an outdated entry is still a lower bound for its
+    # simulator, so only the entry at the top needs to be up to date.
+    # (A simulator's last step can change without a call to this
+    # function in between, e.g. while it waits for get_outputs, so
+    # outdated entries are refreshed, not dropped.)
+    heap = world.last_step_heap
+    if not heap:
+        heap.extend((s.last_step.time, sid) for sid, s in world.sims.items())
+        heapify(heap)
+    while True:
+        time, sid = heap[0]
+        last_step_time = world.sims[sid].last_step.time
+        if time == last_step_time:
+            break
+        heapreplace(heap, (last_step_time, sid))
+    min_cache_time = heap[0][0]
+    # Outputs are never added before the earliest last step, so there is
+    # nothing new to prune unless that has moved.
+    if min_cache_time == world.pruned_until:
+        return
+    world.pruned_until = min_cache_time
     for sim in world.sims.values():
         if sim.outputs:
             sim.outputs = {
@@ -446,32 +563,48 @@ def prune_dataflow_cache(world: World):
             }
 
 
-def get_progress(sims: Dict[SimId, SimRunner], until: int) -> float:
+def get_progress(world: World) -> float:
     """
     Return the current progress of the simulation in percent.
     """
-    times = [sim.progress.time.time for sim in sims.values()]
-    avg_time = sum(times) / len(times)
-    return avg_time * 100 / until
+    return world.progress_sum * 100 / (world.until * len(world.sims))
+
 
+def get_avg_progress(world: World) -> int:
+    """Get the average progress of all simulations (in time steps).
+
+    Simulators that have not reached the end yet count one step further
+    than their progress, so the progress bar moves once the first step
+    is done.
+    """
+    sims_running = len(world.sims) - world.sims_done
+    return (world.progress_sum + sims_running) // len(world.sims)
 
-def get_avg_progress(sims: Dict[SimId, SimRunner], until: int) -> int:
-    """Get the average progress of all simulations (in time steps)."""
-    times = [min(until, sim.progress.time.time + 1) for sim in sims.values()]
-    return sum(times) // len(times)
 
+def advance_progress(
+    sim: SimRunner, world: World, rt_now: Optional[float] = None
+):
+    """Advance the progress of *sim* as far as possible.
 
-def advance_progress(sim: SimRunner, world: World):
-    pre_sim_induced_progress: List[TieredTime] = [
-        pre_sim.next_steps[0] + distance
-        for pre_sim, distance in sim.triggering_ancestors.items()
-        if pre_sim.next_steps
-    ]
+    In real-time mode, *rt_now* can be given as the current value of
+    :func:`time.perf_counter` if it is already known.
+    """
+    pre_sim_induced_progress: List[TieredTime] = []
+    for pre_sim, distance in sim.triggering_ancestor_list:
+        # An ancestor that is currently performing a step has already
+        # removed that step from its next_steps, but can still trigger
+        # us with its output.
+        if pre_sim.current_step:
+            pre_sim_induced_progress.append(pre_sim.current_step + distance)
+        if pre_sim.next_steps:
+            pre_sim_induced_progress.append(pre_sim.next_steps[0] + distance)
 
     next_step_progress: List[TieredTime] = [sim.next_steps[0]] if sim.next_steps else []
     current_step_prog = [sim.current_step] if sim.current_step else []
     if world.rt_factor:
-        rt_passed = perf_counter() - sim.rt_start
+        if rt_now is None:
+            rt_now = perf_counter()
+        rt_passed = rt_now - sim.rt_start
         rt_progress = [TieredTime(ceil(rt_passed / world.rt_factor))]
     else:
         rt_progress = []
@@ -480,8 +613,11 @@ def advance_progress(sim: SimRunner, world: World):
         *next_step_progress,
         *current_step_prog,
         *rt_progress,
-        TieredTime(world.until) + sim.from_world_time,
+        sim.end_time,
     ])
+    world.progress_sum += new_progress.time - sim.progress.time.time
+    if new_progress.time >= world.until > sim.progress.time.time:
+        world.sims_done += 1
     sim.progress.set(new_progress)
     sim.tqdm.update(new_progress.time - sim.tqdm.n)
 
@@ -9,9 +9,9 @@ already running simulators and manage access to them.
 """
 from __future__ import annotations
 
-from ast import literal_eval
 import asyncio
 import collections
+import functools
 import heapq as hq
 import importlib
 import itertools
@@ -27,12 +27,14 @@ from typing import (
     Callable,
     Coroutine,
     Dict,
+    Iterable,
     List,
     NoReturn,
     Optional,
     OrderedDict,
     Set,
     Tuple,
+    Type,
     TYPE_CHECKING,
     Union,
     cast,
@@ -57,6 +59,8 @@ if TYPE_CHECKING:
 
 FULL_ID_SEP = '.'  # Separator for full entity IDs
 FULL_ID = '%s.%s'  # Template for full entity IDs ('sid.eid')
+SENTINEL = object()  # Marks values missing from the output cache
+GET_DATA_CHUNK_SIZE = 1024  # Entities looked up between event loop yields in get_data
 
 class MosaikConfigTotal(TypedDict):
     """A total version for :cls:`MosaikConfig` for internal use.
@@ -117,9 +121,8 @@ async def start(
 
     Return a :class:`SimProxy` instance.
     """
-    try:
-        sim_config = world.sim_config[sim_name]
-    except KeyError:
+    sim_config = world.sim_config.get(sim_name)
+    if sim_config is None:
         raise ScenarioError('Simulator "%s" could not be started: Not found '
                             'in sim_config' % sim_name)
 
@@ -128,9 +131,9 @@ async def start(
     # - python: start_inproc
     # - cmd: start_proc
     # - connect: start_connect
-    starters = StarterCollection()
-
-    for sim_type, starter in starters.items():
+    # (The collection is a singleton, so it is not rebuilt for each start.
+    # It stays a mapping so that other packages can add starters.)
+    for sim_type, starter in StarterCollection().items():
         if sim_type in sim_config:
             proxy = await starter(
                 world.config, sim_name, sim_config, MosaikRemote(world, sim_id)
@@ -157,10 +160,24 @@ async def start(
                 raise SystemExit(
                     f'Simulator "{sim_name}" did not reply to the init() call in time.'
                 )
-    else:
-        raise ScenarioError(
-            f'Simulator "{sim_name}" could not be started: Invalid configuration'
-        )
+
+    raise ScenarioError(
+        f'Simulator "{sim_name}" could not be started: Invalid configuration'
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _import_class(spec: str) -> Type[Any]:
+    """
+    Import and return the class given by *spec* (``'module:Class'``).
+
+    The result is cached, as scenarios often start many instances of the
+    same simulator. (Errors are not cached and are raised again on each
+    call.)
+    """
+    mod_name, cls_name = spec.split(':')
+    mod = importlib.import_module(mod_name)
+    return getattr(mod, cls_name)
 
 
 async def start_inproc(
@@ -179,9 +196,7 @@ async def start_inproc(
     instantiated.
     """
     try:
-        mod_name, cls_name = sim_config['python'].split(':')
-        mod = importlib.import_module(mod_name)
-        cls = getattr(mod, cls_name)
+        cls = _import_class(sim_config['python'])
     except (AttributeError, ImportError, KeyError, ValueError) as err:
         detail_msgs = {
             ValueError: 'Malformed Python class name: Expected "module:Class"',
@@ -254,11 +269,11 @@ async def start_proc(
                 )
 
         try:
+            # The simulator inherits mosaik's standard streams, so no pipes
+            # (and thus no buffering or text mode settings) are needed.
             subprocess.Popen(
-                cmd, 
-                bufsize=1,
+                cmd,
                 cwd=cwd,
-                universal_newlines=True,
                 env=env,  # pass the new env dict to the sub process
                 creationflags=creationflags,
             )
@@ -333,6 +348,23 @@ class SimRunner:
     It stores its simulation state and own the proxy object to the external
     simulator.
     """
+    # The scheduler reads these attributes in every step, so they are
+    # stored in slots. The instance dict is kept (it is only allocated on
+    # first use) for attributes added from outside, like the ones used
+    # by mosaik._debug.
+    __slots__ = [
+        'sid', 'type', 'supports_set_events', '_proxy', 'input_delays',
+        'triggers', 'triggers_by_eid', 'successors', 'successors_to_wait_for',
+        'input_delay_list', 'successor_list', 'successor_to_wait_for_list',
+        'triggering_ancestors', 'triggering_ancestor_list',
+        'triggering_descendants', 'pulled_inputs', 'pulled_input_plan',
+        'output_to_push', 'output_push_plan', 'to_world_time', 'from_world_time',
+        'output_request', 'inputs_from_set_data', 'persistent_inputs',
+        'timed_input_buffer', 'rt_start', 'started', 'next_steps', 'end_time',
+        'next_steps_set', 'newer_step', 'next_self_step', 'progress', 'last_step',
+        'current_step', 'is_in_step', 'output_time', 'data', 'task', 'outputs',
+        'tqdm', '__dict__',
+    ]
 
     sid: SimId
     """This simulator's ID."""
@@ -353,18 +385,57 @@ class SimRunner:
     triggered by output on that port and the delay accrued along that
     edge.
     """
+    triggers_by_eid: Dict[
+        EntityId, List[Tuple[Attr, List[Tuple[SimRunner, TieredInterval]]]]
+    ]
+    """The same information as `triggers`, but grouped by the entity
+    so that each entity's output only needs to be looked up once. This
+    is built by :meth:`~mosaik.scenario.World.cache_triggers`.
+    """
     successors: Dict[SimRunner, TieredInterval]
     successors_to_wait_for: Dict[SimRunner, TieredInterval]
+    input_delay_list: Tuple[Tuple[SimRunner, TieredInterval], ...]
+    successor_list: Tuple[Tuple[SimRunner, TieredInterval], ...]
+    successor_to_wait_for_list: Tuple[Tuple[SimRunner, TieredInterval], ...]
+    """The items of `input_delays`, `successors` and
+    `successors_to_wait_for` as flat tuples for iterating them while
+    waiting for dependencies. These are built by
+    :meth:`~mosaik.scenario.World.cache_dependencies` before the
+    simulation starts.
+    """
     triggering_ancestors: Dict[SimRunner, TieredInterval]
     """An iterable of this sim's ancestors that can trigger a step of
     this simulator. The second component specifies the least amount of
     time that output from the ancestor needs to reach us.
     """
+    triggering_ancestor_list: Tuple[Tuple[SimRunner, TieredInterval], ...]
+    """The items of `triggering_ancestors` as a flat tuple, built by
+    :meth:`~mosaik.scenario.World.cache_dependencies`.
+    """
+    triggering_descendants: List[SimRunner]
+    """The simulators that have this simulator as a triggering
+    ancestor. Only their progress can change when this simulator
+    performs a step (apart from this simulator's own progress).
+    """
     pulled_inputs: Dict[Tuple[SimRunner, TieredInterval], Set[Tuple[Port, Port]]]
     """Output to pull in whenever this simulator performs a step.
     The keys are the source SimRunner and the time shift, the values
     are the source and destination entity-attribute pairs.
     """
+    pulled_input_plan: List[
+        Tuple[
+            SimRunner,
+            Time,
+            Tuple[Tuple[EntityId, Attr, FullId, EntityId, Attr], ...],
+        ]
+    ]
+    """Flattened version of `pulled_inputs` that is iterated during each
+    step. Each entry consists of the source SimRunner, the time shift
+    along the connection and the flat source entity, source attribute,
+    source full ID, destination entity, destination attribute tuples. This is built by
+    :meth:`~mosaik.scenario.World.cache_pulled_inputs` before the
+    simulation starts.
+    """
     output_to_push: Dict[Port, List[Tuple[SimRunner, TieredInterval, Port]]]
     """This lists those connections that use the timed_input_buffer.
     The keys are the entity-attribute pairs of this simulator with
@@ -372,6 +443,21 @@ class SimRunner:
     describing the destinations for that data and the time-shift
     occuring along the connection.
     """
+    output_push_plan: List[
+        Tuple[
+            EntityId,
+            Attr,
+            FullId,
+            Tuple[Tuple[SimRunner, Time, EntityId, Attr], ...],
+        ]
+    ]
+    """Flattened version of `output_to_push` that is iterated after each
+    step. Each entry consists of the source entity, source attribute and
+    source full ID and the flat destination simulator, time shift,
+    destination entity, destination attribute tuples. This is built by
+    :meth:`~mosaik.scenario.World.cache_pushed_outputs` before the
+    simulation starts.
+    """
 
     to_world_time: TieredInterval
     from_world_time: TieredInterval
@@ -395,6 +481,13 @@ class SimRunner:
     """The scheduled next steps this simulator will take, organized as a heap.
     Once the immediate next step has been chosen (and the `has_next_step` event
     has been triggered), the step is moved to `next_step` instead."""
+    end_time: TieredTime  # type: ignore  # set in scheduler.run
+    """The end of the simulation in this simulator's tiered time."""
+    next_steps_set: Set[TieredTime]
+    """The same steps as in `next_steps`, for checking whether a step is
+    already scheduled without scanning the heap. Use
+    :meth:`schedule_step` and :meth:`pop_next_step` to keep both in
+    sync."""
     newer_step: asyncio.Event
     next_self_step: Optional[TieredTime]
     """The next self-scheduled step for this simulator."""
@@ -408,6 +501,9 @@ class SimRunner:
     last_step: TieredTime
     """The most recent step this simulator performed."""
     current_step: Optional[TieredTime]
+    is_in_step: bool
+    """Whether this simulator is currently performing its step (which is
+    when it may make async requests)."""
 
     output_time: TieredTime  # type: ignore  # set on first get_data
     """The output time associated with `data`. Usually, this will be equal to
@@ -439,6 +535,7 @@ class SimRunner:
             self.next_steps = [TieredTime(*([0] * depth))]
         else:
             self.next_steps = []
+        self.next_steps_set = set(self.next_steps)
         self.next_self_step = None
         self.progress = Progress(TieredTime(*([0] * depth)))
 
@@ -451,10 +548,18 @@ class SimRunner:
 
         self.successors_to_wait_for = {}
         self.successors = {}
+        self.input_delay_list = ()
+        self.successor_list = ()
+        self.successor_to_wait_for_list = ()
         self.triggering_ancestors = {}
+        self.triggering_ancestor_list = ()
+        self.triggering_descendants = []
         self.triggers = {}
+        self.triggers_by_eid = {}
         self.output_to_push = {}
+        self.output_push_plan = []
         self.pulled_inputs = {}
+        self.pulled_input_plan = []
 
         self.task = None  # type: ignore  # will be set in World.run
         self.newer_step = asyncio.Event()
@@ -473,14 +578,23 @@ class SimRunner:
         old one and the simulator is currently awaiting it's next
         settled step.
         """
-        if tiered_time in self.next_steps:
+        if tiered_time in self.next_steps_set:
             return tiered_time
 
         is_earlier = not self.next_steps or tiered_time < self.next_steps[0]
         hq.heappush(self.next_steps, tiered_time)
+        self.next_steps_set.add(tiered_time)
         if is_earlier:
             self.newer_step.set()
 
+    def pop_next_step(self) -> TieredTime:
+        """Remove the earliest scheduled step from the next steps and
+        return it.
+        """
+        tiered_time = hq.heappop(self.next_steps)
+        self.next_steps_set.discard(tiered_time)
+        return tiered_time
+
     async def setup_done(self):
         return await self._proxy.send(["setup_done", (), {}])
 
@@ -589,11 +703,12 @@ class MosaikRemote(mosaik_api_v3.MosaikProxy):
         graph = self.world.entity_graph
         if entities is None:
             # repackage NodeViews and EdgeViews to maintain compatibility
-            nodes_list = literal_eval(str(graph.nodes(data=True)))
-            nodes_dict = dict({node[0]: node[1] for node in nodes_list})
-
-            edges_list = literal_eval(str(graph.edges))
-            edges_tuple = tuple(list(edge) + [{}] for edge in edges_list)
+            # (copying the node data so that in-process simulators cannot
+            # modify the entity graph through the result)
+            nodes_dict = {node: dict(data) for node, data in graph.nodes(data=True)}
+            edges_tuple: Tuple[List[Any], ...] = tuple(
+                [src, dest, {}] for src, dest in graph.edges
+            )
 
             return {'nodes': nodes_dict, 'edges': edges_tuple}
         elif isinstance(entities, str):
@@ -620,40 +735,101 @@ class MosaikRemote(mosaik_api_v3.MosaikProxy):
         assert self.sim.current_step is not None, "no current step time"
 
         data: Dict[FullId, Dict[Attr, Any]] = {}
-        missing: Dict[SimId, OutputRequest] = collections.defaultdict(
-            lambda: collections.defaultdict(list)
-        )
-        # Try to get data from cache
-        for full_id, attr_names in attrs.items():
-            sid, eid = full_id.split(FULL_ID_SEP, 1)
-            src_sim = self.world.sims[sid]
-            # Check if async_requests are enabled.
-            self._assert_async_requests(src_sim, self.sim)
-            if self.world.use_cache:
-                cache_slice = src_sim.get_output_for(self.sim.last_step.time)
-            else:
-                cache_slice = {}
-
-            data[full_id] = {}
-            for attr in attr_names:
-                try:
-                    data[full_id][attr] = cache_slice[eid][attr]
-                except KeyError:
-                    missing[sid][eid].append(attr)
-
-        # Query simulator for data not in the cache
-        for sid, attrs in missing.items():
-            dep = self.world.sims[sid]
-            #assert dep.progress.value > self.sim.current_step >= dep.last_step, \
-            #    "sim progress wrong for async requests"
-            dep_data = await dep._proxy.send(["get_data", (attrs,), {}])
+        missing: Dict[SimId, OutputRequest] = {}
+        # The requested entities usually belong to only a few simulators,
+        # so the checks and the cache slice are done once per simulator.
+        cache_slices: Dict[SimId, OutputData] = {}
+        if len(attrs) <= GET_DATA_CHUNK_SIZE:
+            self._get_cached_data(attrs.items(), data, missing, cache_slices)
+        else:
+            # For very large requests, let other simulators' tasks run
+            # between chunks instead of blocking the event loop for the
+            # whole lookup.
+            items = iter(attrs.items())
+            chunk = list(itertools.islice(items, GET_DATA_CHUNK_SIZE))
+            while chunk:
+                self._get_cached_data(chunk, data, missing, cache_slices)
+                await asyncio.sleep(0)
+                chunk = list(itertools.islice(items, GET_DATA_CHUNK_SIZE))
+
+        # Query simulators for data not in the cache. The requests go to
+        # different simulators, so they are sent concurrently and we
+        # only wait for the slowest one instead of all in turn.
+        # (gather wraps each request in a task that takes at least one
+        # round of the event loop to finish, even for in-process
+        # simulators, which answer right away. So a single request, by
+        # far the most common case, is awaited directly.)
+        requests = [
+            self.world.sims[sid].get_data(dep_attrs)
+            for sid, dep_attrs in missing.items()
+        ]
+        results: List[OutputData]
+        if len(requests) == 1:
+            results = [await requests[0]]
+        else:
+            results = await asyncio.gather(*requests)
+        for sid, dep_data in zip(missing, results):
             for eid, vals in dep_data.items():
                 # Maybe there's already an entry for full_id, so we need
                 # to update the dict in that case.
-                data.setdefault(FULL_ID % (sid, eid), {}).update(vals)
+                data.setdefault(f"{sid}{FULL_ID_SEP}{eid}", {}).update(vals)
 
         return data
 
+    def _get_cached_data(
+        self,
+        attrs: Iterable[Tuple[FullId, List[Attr]]],
+        data: Dict[FullId, Dict[Attr, Any]],
+        missing: Dict[SimId, OutputRequest],
+        cache_slices: Dict[SimId, OutputData],
+    ):
+        """
+        Look up the requested *attrs* in the output cache. Found values
+        are added to *data*, the others to *missing*.
+
+        *cache_slices* holds the cache slice of each source simulator
+        that has already been checked; it is shared between the chunks
+        of a large request.
+        """
+        for full_id, attr_names in attrs:
+            sid, eid = full_id.split(FULL_ID_SEP, 1)
+            cache_slice = cache_slices.get(sid)
+            if cache_slice is None:
+                src_sim = self.world.sims[sid]
+                # Check if async_requests are enabled.
+                self._assert_async_requests(src_sim, self.sim)
+                if self.world.use_cache:
+                    cache_slice = src_sim.get_output_for(self.sim.last_step.time)
+                else:
+                    cache_slice = {}
+                cache_slices[sid] = cache_slice
+
+            entity_cache = cache_slice.get(eid)
+            if entity_cache is None:
+                data[full_id] = {}
+                entity_missing: List[Attr] = list(attr_names)
+            elif (
+                len(attr_names) == len(entity_cache)
+                and entity_cache.keys() == set(attr_names)
+            ):
+                # All of the entity's cached outputs were requested (the
+                # common case), so copy them all at once.
+                data[full_id] = entity_cache.copy()
+                continue
+            else:
+                entity_data = data[full_id] = {}
+                entity_missing = []
+                for attr in attr_names:
+                    val = entity_cache.get(attr, SENTINEL)
+                    if val is SENTINEL:
+                        entity_missing.append(attr)
+                    else:
+                        entity_data[attr] = val
+            # Each full ID occurs only once in attrs, so the list of
+            # missing attributes for its entity can simply be stored.
+            if entity_missing:
+                missing.setdefault(sid, {})[eid] = entity_missing
+
     async def set_data(self, data: Dict[FullId, Dict[Attr, Any]]):
         """
         Set *data* as input data for all affected simulators.
@@ -662,11 +838,16 @@ class MosaikRemote(mosaik_api_v3.MosaikProxy):
         IDs with dictionaries of attributes and values (``{'src_full_id':
         {'dest_full_id': {'attr1': 'val1', 'attr2': 'val2'}}}``).
         """
+        # The simulators that data is set for, checked once per call
+        checked_sims: Dict[SimId, SimRunner] = {}
         for src_full_id, dest in data.items():
             for full_id, attributes in dest.items():
                 sid, eid = full_id.split(FULL_ID_SEP, 1)
-                src_sim = self.world.sims[sid]
-                self._assert_async_requests(src_sim, self.sim)
+                src_sim = checked_sims.get(sid)
+                if src_sim is None:
+                    src_sim = self.world.sims[sid]
+                    self._assert_async_requests(src_sim, self.sim)
+                    checked_sims[sid] = src_sim
                 inputs = src_sim.inputs_from_set_data.setdefault(eid, {})
                 for attr, val in attributes.items():
                     inputs.setdefault(attr, {})[src_full_id] = val
@@ -758,8 +939,14 @@ class TimedInputBuffer:
         self.input_queue = []
         self.counter = itertools.count()  # Used to chronologically sort entries
 
-    def add(self, time: Time, src_sid: SimId, src_eid: EntityId, dest_eid: EntityId, dest_attr: Attr, value: Any):
-        src_full_id = f"{src_sid}.{src_eid}"
+    def add(
+        self,
+        time: Time,
+        src_full_id: FullId,
+        dest_eid: EntityId,
+        dest_attr: Attr,
+        value: Any,
+    ):
         hq.heappush(
             self.input_queue,
             (time, next(self.counter), src_full_id, dest_eid, dest_attr, value)
@@ -290,6 +290,11 @@ def test_world_connect_time_shifted(world: World):
         },
     }
 
+    world.cache_pulled_inputs()
+    assert sim_b.pulled_input_plan == [
+        (sim_a, 1, ((a.eid, 'val_out', a.full_id, b.eid, 'val_out'),)),
+    ]
+
 
 def test_weak_outside_group(world: World):
     a = world.start('ExampleSim').A(init_val=0)
@@ -1,12 +1,11 @@
 from __future__ import annotations
 
 import asyncio
-from heapq import heappop, heappush
 from mosaik_api_v3 import InputData
 import pytest
 from pytest import mark, param
 from tqdm import tqdm
-from typing import Any, Coroutine, Iterable, List
+from typing import Any, Coroutine, Iterable, List, cast
 
 from mosaik import exceptions, scenario, scheduler, simmanager, World
 from mosaik.adapters import init_and_get_adapter
@@ -36,6 +35,15 @@ async def does_coroutine_stall(coro: Coroutine[Any, Any, Any], max_pass_backs: i
     return task.cancelled()
 
 
+def set_next_steps(sim: SimRunner, next_steps: Iterable[TieredTime]):
+    """Replace the steps scheduled for *sim* by *next_steps*, keeping
+    its ``next_steps_set`` in sync."""
+    while sim.next_steps:
+        sim.pop_next_step()
+    for step in next_steps:
+        sim.schedule_step(step)
+
+
 @pytest.fixture(name='world')
 def world_fixture(request: pytest.FixtureRequest):
     """This fixture provides an example scenario for testing the
@@ -95,8 +103,12 @@ def world_fixture(request: pytest.FixtureRequest):
 
 
     world.until = 4
+    for sim in world.sims.values():
+        sim.end_time = TieredTime(world.until) + sim.from_world_time
     world.rt_factor = None
     world.cache_triggering_ancestors()
+    world.cache_triggers()
+    world.cache_dependencies()
     yield world
     world.shutdown()
 
@@ -164,6 +176,25 @@ async def test_sim_process_error(monkeypatch):
                                   'its connection.')
 
 
+@pytest.mark.parametrize('world', ['time-based', 'event-based'], indirect=True)
+def test_triggering_descendants(world: World):
+    descendants = {
+        sid: {d.sid for d in sim.triggering_descendants}
+        for sid, sim in world.sims.items()
+    }
+    if world.sims['Sim-0'].triggers:
+        assert descendants == {
+            'Sim-0': {'Sim-2', 'Sim-3'},
+            'Sim-1': {'Sim-2', 'Sim-3'},
+            'Sim-2': {'Sim-3'},
+            'Sim-3': set(),
+            'Sim-4': {'Sim-5'},
+            'Sim-5': {'Sim-4'},
+        }
+    else:
+        assert all(not d for d in descendants.values())
+
+
 def any_unset(events: Iterable[asyncio.Event]) -> bool:
     """
     Returns whether any of the events of the given iterable is unset.
@@ -183,8 +214,9 @@ async def test_wait_for_dependencies(world: World, weak: bool, number_waiting: i
     """
     test_sim: SimRunner = world.sims["Sim-2"]
     pred_sim: SimRunner = world.sims["Sim-1"]
-    heappush(test_sim.next_steps, TieredTime(0))
+    test_sim.schedule_step(TieredTime(0))
     test_sim.input_delays[pred_sim] = TieredInterval(0, 1)
+    world.cache_dependencies()
     stalled = await does_coroutine_stall(
         scheduler.wait_for_dependencies(test_sim, True)
     )
@@ -197,7 +229,7 @@ async def test_wait_for_dependencies_all_done(world: World):
     """
     All dependencies already stepped far enough. No waiting required.
     """
-    heappush(world.sims["Sim-2"].next_steps, TieredTime(0))
+    world.sims["Sim-2"].schedule_step(TieredTime(0))
     for dep_sid in ["Sim-0", "Sim-1"]:
         world.sims[dep_sid].progress.time = TieredTime(1)
     stalled = await does_coroutine_stall(
@@ -218,7 +250,7 @@ async def test_wait_for_dependencies_shifted(world: World, progress: int, should
     world.sims["Sim-5"].progress = Progress(TieredTime(progress))
     # Move this simulators first step to 1
     sim_under_test = world.sims["Sim-4"]
-    sim_under_test.next_steps = [TieredTime(1)]
+    set_next_steps(sim_under_test, [TieredTime(1)])
     stalled = await does_coroutine_stall(
         scheduler.wait_for_dependencies(sim_under_test, lazy_stepping=False),
         max_pass_backs=3,
@@ -234,7 +266,7 @@ async def test_wait_for_dependencies_lazy(world: World, lazy_stepping: bool):
     Test waiting for dependencies and triggering them.
     """
     sim_under_test = world.sims["Sim-1"]
-    sim_under_test.next_steps = [TieredTime(1)]
+    set_next_steps(sim_under_test, [TieredTime(1)])
     stalled = await does_coroutine_stall(
         scheduler.wait_for_dependencies(sim_under_test, lazy_stepping)
     )
@@ -261,6 +293,7 @@ def test_get_input_data(world: World):
     }
     sim_2.pulled_inputs[(sim_0, TieredInterval(0))] = set([(('1', 'x'), ('0', 'in'))])
     sim_2.pulled_inputs[(sim_1, TieredInterval(0))] = set([(('2', 'z'), ('0', 'in'))])
+    world.cache_pulled_inputs()
     data = scheduler.get_input_data(world, sim_2)
     assert data == {'0': {
         'in': {'Sim-0.1': 0, 'Sim-1.2': 4, '3': 5},
@@ -268,6 +301,44 @@ def test_get_input_data(world: World):
     }}
 
 
+@pytest.mark.parametrize('world', ['time-based'], indirect=True)
+def test_get_input_data_persistent(world: World):
+    """
+    Persistent inputs are merged into the input data and updated with
+    new values for the persistent connections only.
+    """
+    sim_2 = world.sims["Sim-2"]
+    sim_2.current_step = TieredTime(0)
+    sim_2.persistent_inputs = {
+        '0': {'in': {'Sim-0.1': 3, 'Sim-1.2': 4}},
+        '1': {'in': {'Sim-0.1': 6}},
+    }
+    sim_2.inputs_from_set_data = {
+        '0': {'in': {'Sim-1.2': 5, '3': 7}},
+    }
+    world.cache_pulled_inputs()
+    data = scheduler.get_input_data(world, sim_2)
+    assert data == {
+        '0': {'in': {'Sim-0.1': 3, 'Sim-1.2': 5, '3': 7}},
+        '1': {'in': {'Sim-0.1': 6}},
+    }
+    assert sim_2.persistent_inputs == {
+        '0': {'in': {'Sim-0.1': 3, 'Sim-1.2': 5}},
+        '1': {'in': {'Sim-0.1': 6}},
+    }
+
+
+@pytest.mark.parametrize('world', ['time-based'], indirect=True)
+def test_get_input_data_no_inputs(world: World):
+    """
+    A simulator without any inputs gets an empty dict.
+    """
+    sim_0 = world.sims["Sim-0"]
+    sim_0.current_step = TieredTime(0)
+    world.cache_pulled_inputs()
+    assert scheduler.get_input_data(world, sim_0) == {}
+
+
 @pytest.mark.parametrize('world', ['time-based'], indirect=True)
 def test_get_input_data_shifted(world: World):
     """
@@ -278,6 +349,7 @@ def test_get_input_data_shifted(world: World):
     sim_4.current_step = TieredTime(0)
     sim_5.outputs = {-1: {'1': {'z': 7}}}
     sim_4.pulled_inputs[(sim_5, TieredInterval(1))] = set([(('1', 'z'), ('0', 'in'))])
+    world.cache_pulled_inputs()
     data = scheduler.get_input_data(world, world.sims["Sim-4"])
     assert data == {'0': {'in': {'Sim-5.1': 7}}}
 
@@ -299,21 +371,30 @@ def test_get_max_advance(
     expected: int,
 ):
     sim = world.sims["Sim-2"]
-    sim.next_steps = next_steps
+    set_next_steps(sim, next_steps)
     sim.tqdm = tqdm(disable=True)
-    heappush(sim.next_steps, TieredTime(1))
-    sim.current_step = heappop(sim.next_steps)
+    sim.schedule_step(TieredTime(1))
+    sim.current_step = sim.pop_next_step()
 
     # In the event-based world, Sim-0 and Sim-1 are triggering ancestors
     # of Sim-2:
-    world.sims["Sim-0"].next_steps = [TieredTime(3)]
+    set_next_steps(world.sims["Sim-0"], [TieredTime(3)])
     if next_step_s1 is not None:
-        heappush(world.sims["Sim-1"].next_steps, next_step_s1)
+        world.sims["Sim-1"].schedule_step(next_step_s1)
 
     max_advance = scheduler.get_max_advance(world, sim, until=5)
     assert max_advance == expected
 
 
+@pytest.mark.parametrize('world', ['event-based'], indirect=True)
+def test_get_max_advance_ancestor_in_step(world: World):
+    sim = world.sims["Sim-2"]
+    sim.current_step = TieredTime(1)
+    world.sims["Sim-0"].current_step = TieredTime(2)
+
+    assert scheduler.get_max_advance(world, sim, until=5) == 1
+
+
 # TODO: Implement test/parameter for new API (passing max_advance)
 @pytest.mark.asyncio
 @pytest.mark.parametrize('world', ['time-based', 'event-based'], indirect=True)
@@ -322,9 +403,9 @@ async def test_step(world: World):
     sim = world.sims["Sim-0"]
     sim.tqdm = tqdm(disable=True)
     if sim.type == 'event-based':
-        heappush(sim.next_steps, TieredTime(0))
+        sim.schedule_step(TieredTime(0))
     assert (sim.last_step, sim.next_steps[0]) == (TieredTime(-1), TieredTime(0))
-    sim.current_step = heappop(sim.next_steps)
+    sim.current_step = sim.pop_next_step()
 
     await scheduler.step(world, sim, inputs, 0)
     assert (sim.last_step, sim.next_steps) == (
@@ -347,7 +428,7 @@ async def test_get_outputs(world: World, cache: bool):
     sim.tqdm = tqdm(disable=True)
 
     if sim.type == 'time-based':
-        sim.current_step = heappop(sim.next_steps)
+        sim.current_step = sim.pop_next_step()
     else:
         sim.current_step = TieredTime(0)
     await scheduler.get_outputs(world, sim)
@@ -386,6 +467,7 @@ async def test_get_outputs_buffered(world: scenario.World):
         ('0', 'x'): [(world.sims["Sim-2"], TieredInterval(0), ('0', 'in'))],
         ('0', 'z'): [(world.sims["Sim-1"], TieredInterval(0), ('0', 'in'))],
     }
+    world.cache_pushed_outputs()
 
     await scheduler.get_outputs(world, sim)
     assert world.sims["Sim-2"].timed_input_buffer.input_queue == [(0, 0, 'Sim-0.0', '0', 'in', 0)]
@@ -411,7 +493,7 @@ def test_notify_dependencies(
     sim.data = {'1': {'x': 1}}
     sim.output_time = output_time
 
-    heappush(world.sims["Sim-2"].next_steps, TieredTime(2))
+    world.sims["Sim-2"].schedule_step(TieredTime(2))
 
     scheduler.notify_dependencies(sim)
 
@@ -446,6 +528,39 @@ def test_prune_dataflow_cache(world: World):
         1: {'foo': 'bar'},
     }
 
+    world.sims["Sim-0"].outputs[2] = {'foo': 'baz'}
+    for s in world.sims.values():
+        s.last_step = TieredTime(2)
+        scheduler.prune_dataflow_cache(world)
+        if s.sid != "Sim-5":
+            # Sim-5 is still at time 1
+            assert 1 in world.sims["Sim-0"].outputs
+
+    assert world.sims["Sim-0"].outputs == {
+        2: {'foo': 'baz'},
+    }
+
+
+@pytest.mark.parametrize('world', ['time-based'], indirect=True)
+def test_prune_dataflow_cache_unpruned_step(world: World):
+    """
+    A simulator's last step can move on without a prune in between (e.g.
+    while it is still fetching its outputs). Its old entry must not make
+    the pruning skip over its new last step.
+    """
+    world.use_cache = True
+    for s in world.sims.values():
+        s.last_step = TieredTime(1)
+    scheduler.prune_dataflow_cache(world)
+    world.sims["Sim-0"].outputs = {5: {'foo': 'bar'}, 7: {'foo': 'baz'}}
+    for s in world.sims.values():
+        s.last_step = TieredTime(7)
+    world.sims["Sim-1"].last_step = TieredTime(5)
+    scheduler.prune_dataflow_cache(world)
+
+    assert world.pruned_until == 5
+    assert world.sims["Sim-0"].outputs == {5: {'foo': 'bar'}, 7: {'foo': 'baz'}}
+
 
 @pytest.mark.asyncio
 @pytest.mark.parametrize('world', ['time-based'], indirect=True)
@@ -457,9 +572,9 @@ async def test_get_outputs_shifted(world: World):
     sim.progress = Progress(TieredTime(1))
     sim.last_step = TieredTime(1)
     sim.tqdm = tqdm(disable=True)
-    heappush(world.sims["Sim-4"].next_steps, TieredTime(2))
+    world.sims["Sim-4"].schedule_step(TieredTime(2))
     
-    sim.current_step = heappop(sim.next_steps)
+    sim.current_step = sim.pop_next_step()
     await scheduler.get_outputs(world, sim)
     scheduler.notify_dependencies(sim)
     scheduler.prune_dataflow_cache(world)
@@ -468,24 +583,71 @@ async def test_get_outputs_shifted(world: World):
     }
 
 
+class _ProgressWorld:
+    """Stand-in for a :class:`~mosaik.scenario.World` with two simulators
+    that only has the attributes the progress functions need."""
+    until = 4
+    sims = {0: None, 1: None}
+    progress_sum = 0
+    sims_done = 0
+
+
 def test_get_progress():
-    class Sim:
-        def __init__(self, time):
-            self.progress = Progress(TieredTime(time))
+    world = cast(World, _ProgressWorld())
+    assert scheduler.get_progress(world) == 0
+
+    world.progress_sum = 1
+    assert scheduler.get_progress(world) == 12.5
 
-    sims = {i: Sim(0) for i in range(2)}
-    assert scheduler.get_progress(sims, 4) == 0
+    world.progress_sum = 2
+    assert scheduler.get_progress(world) == 25
 
-    sims[0].progress.time = TieredTime(1)
-    assert scheduler.get_progress(sims, 4) == 12.5
+    world.progress_sum = 6
+    assert scheduler.get_progress(world) == 75
 
-    sims[0].progress.time = TieredTime(2)
-    assert scheduler.get_progress(sims, 4) == 25
+    world.progress_sum = 8
+    assert scheduler.get_progress(world) == 100
 
-    sims[1].progress.time = TieredTime(3)
-    sims[0].progress.time = TieredTime(3)
-    assert scheduler.get_progress(sims, 4) == 75
 
-    sims[0].progress.time = TieredTime(4)
-    sims[1].progress.time = TieredTime(4)
-    assert scheduler.get_progress(sims, 4) == 100
+def test_get_avg_progress():
+    world = cast(World, _ProgressWorld())
+    assert scheduler.get_avg_progress(world) == 1
+
+    world.progress_sum = 7
+    world.sims_done = 1
+    assert scheduler.get_avg_progress(world) == 4
+
+    world.progress_sum = 8
+    world.sims_done = 2
+    assert scheduler.get_avg_progress(world) == 4
+
+
+@pytest.mark.parametrize('world', ['event-based'], indirect=True)
+def test_advance_progress_ancestor_in_step(world: World):
+    """
+    An ancestor that is currently stepping holds back the progress of
+    the simulators it can trigger.
+    """
+    sim = world.sims["Sim-2"]
+    sim.tqdm = tqdm(disable=True)
+    world.sims["Sim-0"].current_step = TieredTime(1)
+    scheduler.advance_progress(sim, world)
+    assert sim.progress.time == TieredTime(1)
+
+    world.sims["Sim-0"].current_step = None
+    scheduler.advance_progress(sim, world)
+    assert sim.progress.time == TieredTime(world.until)
+
+
+@pytest.mark.parametrize('world', ['time-based', 'event-based'], indirect=True)
+def test_advance_progress_sum(world: World):
+    for sim in world.sims.values():
+        sim.tqdm = tqdm(disable=True)
+    for sim in world.sims.values():
+        scheduler.advance_progress(sim, world)
+    assert world.progress_sum == sum(
+        sim.progress.time.time for sim in world.sims.values()
+    )
+    assert world.sims_done == sum(
+        sim.progress.time.time >= world.until for sim in world.sims.values()
+    )
@@ -7,7 +7,7 @@ from loguru import logger
 import pytest
 import sys
 import time
-from typing import Any, Callable, Coroutine, Type, cast
+from typing import Any, Callable, Coroutine, Dict, List, Type, cast
 
 from example_sim.mosaik import ExampleSim
 from mosaik_api_v3 import Meta, __api_version__ as api_version
@@ -399,6 +399,42 @@ def test_local_process(world):
     assert sim.next_steps == [TieredTime(0)]
 
 
+def test_local_process_meta_copied(world):
+    es = ExampleSim()
+    proxy = LocalProxy(es, None)
+    world.loop.run_until_complete(proxy.init("ExampleSim-0", time_resolution=1.0))
+    assert proxy.meta == es.meta
+    assert proxy.meta is not es.meta
+    for model, model_meta in proxy.meta["models"].items():
+        assert model_meta["attrs"] is not es.meta["models"][model]["attrs"]
+
+
+def test_schedule_step(world):
+    proxy = LocalProxy(ExampleSim(), None)
+    world.loop.run_until_complete(proxy.init("ExampleSim-0", time_resolution=1.0))
+    sim = simmanager.SimRunner("ExampleSim-0", proxy)
+    sim.schedule_step(TieredTime(2))
+    sim.schedule_step(TieredTime(1))
+    sim.schedule_step(TieredTime(2))
+    assert sorted(sim.next_steps) == [TieredTime(0), TieredTime(1), TieredTime(2)]
+    assert sim.pop_next_step() == TieredTime(0)
+    assert sim.pop_next_step() == TieredTime(1)
+    sim.schedule_step(TieredTime(1))
+    assert sorted(sim.next_steps) == [TieredTime(1), TieredTime(2)]
+    assert sim.next_steps_set == {TieredTime(1), TieredTime(2)}
+
+
+def test_schedule_step_duplicate(world):
+    proxy = LocalProxy(ExampleSim(), None)
+    world.loop.run_until_complete(proxy.init("ExampleSim-0", time_resolution=1.0))
+    sim = simmanager.SimRunner("ExampleSim-0", proxy)
+    sim.pop_next_step()
+    sim.schedule_step(TieredTime(1))
+    sim.schedule_step(TieredTime(1))
+    assert sim.next_steps == [TieredTime(1)]
+    assert sim.next_steps_set == {TieredTime(1)}
+
+
 def test_local_process_finalized(world):
     """
     Test that ``finalize()`` is called for local processes (issue #23).
@@ -615,14 +651,91 @@ def test_mosaik_remote(
         world.shutdown()
 
 
+class _GetDataProxy:
+    """
+    Proxy for the source simulator in the ``get_data()`` tests that
+    records the requests for data that is not in the cache.
+    """
+
+    def __init__(self):
+        self.requests: List[Any] = []
+
+    @property
+    def meta(self):
+        return {"type": "time-based", "models": {}}
+
+    async def send(self, msg: Any):
+        _, (attrs,), _ = msg
+        self.requests.append(attrs)
+        return {
+            eid: {attr: f"{eid}.{attr}" for attr in eid_attrs}
+            for eid, eid_attrs in attrs.items()
+        }
+
+    async def stop(self):
+        pass
+
+
+def _get_data(world: World, attrs: Dict[str, List[str]]):
+    """
+    Set up a simulator "A" that "B" has async. requests to and let "B"
+    request *attrs* via :meth:`~mosaik.simmanager.MosaikRemote.get_data()`.
+    Return the data and the requests that were sent to "A".
+    """
+    proxy_a = _GetDataProxy()
+    sim_a = simmanager.SimRunner("A", cast(BaseProxy, proxy_a))
+    sim_b = simmanager.SimRunner("B", cast(BaseProxy, _GetDataProxy()))
+    sim_a.successors[sim_b] = TieredInterval(0)
+    sim_a.successors_to_wait_for[sim_b] = TieredInterval(0)
+    sim_a.outputs = {0: {
+        str(i): {"x": f"{i}.x", "y": f"{i}.y"} for i in range(0, 10, 2)
+    }}
+    sim_b.last_step = TieredTime(0)
+    sim_b.current_step = TieredTime(0)
+    sim_b.is_in_step = True
+    world.sims["A"] = sim_a
+    world.sims["B"] = sim_b
+    remote = simmanager.MosaikRemote(world, "B")
+    data = world.loop.run_until_complete(remote.get_data(attrs))
+    return data, proxy_a.requests
+
+
+def test_get_data_partial_hit(world: World):
+    """
+    Attributes that are not in the cache are requested from the source
+    simulator and merged with the cached ones.
+    """
+    world.use_cache = True
+    data, requests = _get_data(world, {"A.0": ["x", "z"], "A.1": ["x"]})
+    assert data == {
+        "A.0": {"x": "0.x", "z": "0.z"},
+        "A.1": {"x": "1.x"},
+    }
+    assert requests == [{"0": ["z"], "1": ["x"]}]
+
+
+def test_get_data_large_request(world: World, monkeypatch: pytest.MonkeyPatch):
+    """
+    Requests above the chunk size are looked up in several chunks but
+    return the same data as smaller ones.
+    """
+    world.use_cache = True
+    attrs = {f"A.{i}": ["x", "y"] for i in range(7)}
+    expected = {f"A.{i}": {"x": f"{i}.x", "y": f"{i}.y"} for i in range(7)}
+    monkeypatch.setattr(simmanager, "GET_DATA_CHUNK_SIZE", 2)
+    data, requests = _get_data(world, attrs)
+    assert data == expected
+    assert requests == [{str(i): ["x", "y"] for i in range(1, 7, 2)}]
+
+
 def test_timed_input_buffer():
     """Test TimedInputBuffer, especially if a lower value is added at the same
     time for the same connection.
     """
     buffer = simmanager.TimedInputBuffer()
-    buffer.add(1, "src_sid", "src_eid", "dest_eid", "dest_var", 2)
-    buffer.add(1, "src_sid", "src_eid", "dest_eid", "dest_var", 1)
-    buffer.add(2, "src_sid", "src_eid", "dest_eid", "dest_var", 0)
+    buffer.add(1, "src_sid.src_eid", "dest_eid", "dest_var", 2)
+    buffer.add(1, "src_sid.src_eid", "dest_eid", "dest_var", 1)
+    buffer.add(2, "src_sid.src_eid", "dest_eid", "dest_var", 0)
     input_dict = buffer.get_input({}, 0)
     assert input_dict == {}
     input_dict = buffer.get_input({}, 1)